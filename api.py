@@ -1,20 +1,26 @@
 """
 FastAPI Backend for Compliance Engine
 Upload files and run the compliance pipeline via API
+Pipeline steps run in-process (via asyncio.to_thread) so heavy libraries
+and the LLM client stay resident between runs instead of being re-imported
+by a fresh interpreter per step.
 """
 
 import os
+import io
 import json
-import shutil
+import mmap
+import asyncio
+import aiofiles
+import contextlib
 from pathlib import Path
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime
+from uuid import uuid4
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import FastAPI, Request, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
-import subprocess
-import sys
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
 
 # =====================================================
 # APP SETUP
@@ -22,7 +28,8 @@ import sys
 app = FastAPI(
     title="Compliance Engine API",
     description="Upload regulatory, policy, and system files to check compliance",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Enable CORS for frontend
@@ -47,29 +54,49 @@ sessions = {}
 # =====================================================
 # HELPER FUNCTIONS
 # =====================================================
-def save_uploaded_file(file: UploadFile, destination: Path) -> Path:
-    """Save an uploaded file to disk."""
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+
+async def save_uploaded_file(file: UploadFile, destination: Path) -> Path:
+    """Save an uploaded file to disk via async chunked streaming.
+
+    Streams 1 MiB chunks so large uploads never block the event loop
+    and are never fully buffered in memory.
+    """
     destination.parent.mkdir(parents=True, exist_ok=True)
-    
-    with open(destination, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
+
+    async with aiofiles.open(destination, "wb") as buffer:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await buffer.write(chunk)
+
     return destination
 
 
-def run_pipeline_step(script_name: str) -> tuple[bool, str]:
-    """Run a pipeline step and return (success, output)."""
-    script_path = PROJECT_ROOT / "src" / script_name
-    
-    result = subprocess.run(
-        [sys.executable, str(script_path)],
-        cwd=PROJECT_ROOT,
-        capture_output=True,
-        text=True
-    )
-    
-    output = result.stdout + result.stderr
-    return result.returncode == 0, output
+def get_pipeline_steps():
+    """
+    Import the step modules lazily and return [(step_fn, name), ...].
+    Importing here (not at module load) keeps API startup fast; once
+    imported, the modules stay resident for every subsequent run.
+    """
+    from src import s1_extract, s2_llm_process, s3_bank_ext, s4_final
+
+    return [
+        (s1_extract.main, "Extraction"),
+        (s2_llm_process.main, "Regulation Processing"),
+        (s3_bank_ext.main, "Bank Extraction"),
+        (s4_final.main, "Comparison"),
+    ]
+
+
+def run_pipeline_step(step_fn) -> tuple[bool, str]:
+    """Run a pipeline step in-process and return (success, output)."""
+    buf = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buf):
+            step_fn()
+        return True, buf.getvalue()
+    except Exception as e:
+        return False, buf.getvalue() + f"\n❌ {type(e).__name__}: {e}"
 
 
 # =====================================================
@@ -84,9 +111,9 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "POST /upload": "Upload regulation, policy, and system_rules files",
-            "POST /process": "Run the full compliance pipeline",
+            "POST /process": "Start the compliance pipeline (returns 202 + job id)",
             "GET /results": "Get compliance report (CSV or JSON)",
-            "GET /status": "Check pipeline status"
+            "GET /status/{job_id}": "Check pipeline job status"
         }
     }
 
@@ -117,9 +144,9 @@ async def upload_files(
             raise HTTPException(400, "System rules file must be an XLSX")
         
         # Save files
-        reg_path = save_uploaded_file(regulation, DATA_RAW / "regulation.pdf")
-        pol_path = save_uploaded_file(policy, DATA_RAW / "policy.docx")
-        sys_path = save_uploaded_file(system_rules, DATA_RAW / "system_rules.xlsx")
+        reg_path = await save_uploaded_file(regulation, DATA_RAW / "regulation.pdf")
+        pol_path = await save_uploaded_file(policy, DATA_RAW / "policy.docx")
+        sys_path = await save_uploaded_file(system_rules, DATA_RAW / "system_rules.xlsx")
         
         return {
             "status": "success",
@@ -137,11 +164,47 @@ async def upload_files(
         raise HTTPException(500, f"Upload failed: {str(e)}")
 
 
-@app.post("/process")
-async def process_files(background_tasks: BackgroundTasks):
+# In-flight pipeline jobs. Single-process state: move to Redis/Celery
+# before jobs must survive restarts or span multiple uvicorn workers.
+JOBS: dict[str, dict] = {}
+
+# Strong references to running job tasks - asyncio keeps only weak refs,
+# so an unreferenced task can be garbage-collected mid-flight. Kept out
+# of JOBS so /status responses stay JSON-serializable.
+_JOB_TASKS: dict[str, asyncio.Task] = {}
+
+
+def _run_pipeline_job(job_id: str):
+    """Run all pipeline steps for a job, updating its status as it goes."""
+    job = JOBS[job_id]
+    job["status"] = "running"
+
+    for step_fn, name in get_pipeline_steps():
+        job["current_step"] = name
+        success, output = run_pipeline_step(step_fn)
+        job["results"].append({
+            "step": name,
+            "success": success,
+            "output_preview": output[:500] if output else ""
+        })
+
+        if not success:
+            job["status"] = "failed"
+            job["failed_at"] = name
+            job["current_step"] = None
+            return
+
+    job["status"] = "completed"
+    job["current_step"] = None
+    job["output_file"] = "data/final_jsons/compliance_report.csv"
+
+
+@app.post("/process", status_code=202)
+async def process_files():
     """
-    Run the full compliance pipeline on uploaded files.
-    This runs all 4 steps: Extract → Regulation → Bank → Compare
+    Start the compliance pipeline on uploaded files as a background job.
+    Returns 202 with a job id immediately; poll GET /status/{job_id}
+    until the job reports completed or failed.
     """
     # Check if files exist
     required_files = [
@@ -149,49 +212,58 @@ async def process_files(background_tasks: BackgroundTasks):
         DATA_RAW / "policy.docx",
         DATA_RAW / "system_rules.xlsx"
     ]
-    
+
     for f in required_files:
         if not f.exists():
             raise HTTPException(400, f"Missing file: {f.name}. Please upload files first.")
-    
-    # Run pipeline steps
-    steps = [
-        ("s1_extract.py", "Extraction"),
-        ("s2_llm_process.py", "Regulation Processing"),
-        ("s3_bank_ext.py", "Bank Extraction"),
-        ("s4_final.py", "Comparison"),
-    ]
-    
-    results = []
-    
-    for script, name in steps:
-        success, output = run_pipeline_step(script)
-        results.append({
-            "step": name,
-            "success": success,
-            "output_preview": output[:500] if output else ""
-        })
-        
-        if not success:
-            return JSONResponse(
-                status_code=500,
-                content={
-                    "status": "failed",
-                    "failed_at": name,
-                    "results": results
-                }
-            )
-    
+
+    # Single-flight: the steps share the data/ files and the process-wide
+    # stdout capture in run_pipeline_step, so overlapping jobs would
+    # corrupt each other's inputs and logs
+    active = next(
+        (j["job_id"] for j in JOBS.values() if j["status"] in ("queued", "running")),
+        None,
+    )
+    if active is not None:
+        raise HTTPException(
+            409,
+            f"Pipeline job {active} is already running. "
+            f"Poll /status/{active} and retry once it finishes."
+        )
+
+    job_id = uuid4().hex
+    JOBS[job_id] = {
+        "job_id": job_id,
+        "status": "queued",
+        "current_step": None,
+        "results": [],
+        "created_at": datetime.now().isoformat()
+    }
+
+    # Run in a worker thread so the event loop stays free for polling;
+    # hold a reference until done so the task can't be collected mid-run
+    task = asyncio.create_task(asyncio.to_thread(_run_pipeline_job, job_id))
+    _JOB_TASKS[job_id] = task
+    task.add_done_callback(lambda _, job_id=job_id: _JOB_TASKS.pop(job_id, None))
+
     return {
-        "status": "completed",
-        "message": "Pipeline completed successfully",
-        "results": results,
-        "output_file": "data/final_jsons/compliance_report.csv"
+        "status": "accepted",
+        "job_id": job_id,
+        "message": "Pipeline started. Poll /status/{job_id} for progress."
     }
 
 
+@app.get("/status/{job_id}")
+async def get_job_status(job_id: str):
+    """Get the status of a pipeline job."""
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(404, f"Unknown job id: {job_id}")
+    return job
+
+
 @app.get("/results")
-async def get_results(format: str = "json"):
+async def get_results(request: Request, format: str = "json"):
     """
     Get the compliance report.
     Query params:
@@ -203,57 +275,64 @@ async def get_results(format: str = "json"):
         raise HTTPException(404, "No results found. Please run /process first.")
     
     if format.lower() == "csv":
+        # Serve the pre-compressed report when the client accepts gzip
+        # (5-10x fewer bytes on the wire for text CSVs)
+        gzip_path = csv_path.with_name(csv_path.name + ".gz")
+        if (
+            "gzip" in request.headers.get("accept-encoding", "")
+            and gzip_path.exists()
+            and gzip_path.stat().st_mtime >= csv_path.stat().st_mtime
+        ):
+            return FileResponse(
+                gzip_path,
+                media_type="text/csv",
+                filename="compliance_report.csv",
+                headers={"Content-Encoding": "gzip"}
+            )
+
         return FileResponse(
             csv_path,
             media_type="text/csv",
             filename="compliance_report.csv"
         )
-    
-    # Return as JSON
+
+    # Stream as JSON row-by-row so large reports never sit fully in memory
     import csv
-    results = []
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        results = list(reader)
-    
-    return {
-        "status": "success",
-        "total_rules": len(results),
-        "results": results
-    }
 
+    def generate_json():
+        yield '{"status": "success", "results": ['
+        first = True
+        with open(csv_path, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if not first:
+                    yield ","
+                yield json.dumps(row, ensure_ascii=False)
+                first = False
+        yield "]}"
 
-@app.get("/results/regulatory")
-async def get_regulatory_rules():
-    """Get extracted regulatory rules."""
-    path = DATA_FINAL / "regulatory_rules.json"
-    if not path.exists():
-        raise HTTPException(404, "No regulatory rules found")
-    
-    with open(path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return StreamingResponse(generate_json(), media_type="application/json")
 
 
-@app.get("/results/policy")
-async def get_policy_rules():
-    """Get extracted bank policy rules."""
-    path = DATA_FINAL / "bank_policy_rules.json"
-    if not path.exists():
-        raise HTTPException(404, "No policy rules found")
-    
-    with open(path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+RESULT_FILES = {
+    "regulatory": "regulatory_rules.json",
+    "policy": "bank_policy_rules.json",
+    "system": "system_rules.json",
+}
 
 
-@app.get("/results/system")
-async def get_system_rules():
-    """Get extracted system rules."""
-    path = DATA_FINAL / "system_rules.json"
+@app.get("/results/{kind}")
+async def get_extracted_rules(kind: Literal["regulatory", "policy", "system"]):
+    """Get extracted rules of the given kind (regulatory, policy or system)."""
+    path = DATA_FINAL / RESULT_FILES[kind]
     if not path.exists():
-        raise HTTPException(404, "No system rules found")
-    
-    with open(path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+        raise HTTPException(404, f"No {kind} rules found")
+
+    # The file on disk is already valid JSON - mmap it and send the bytes
+    # as-is, with no parse/re-serialize round-trip and no read() copy
+    # through a Python buffer.
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return Response(content=bytes(mm), media_type="application/json")
 
 
 # =====================================================
@@ -261,4 +340,21 @@ async def get_system_rules():
 # =====================================================
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+
+    if os.getenv("DEV"):
+        # Dev mode: single process with auto-reload file watcher
+        uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
+    else:
+        # Production: uvloop + httptools ship with uvicorn[standard].
+        # Default to one worker: job state (JOBS) is per-process, so with
+        # N workers a /status poll can land on a worker that never saw
+        # the job and 404. API_WORKERS is the opt-in for scale-out once
+        # job state moves to shared storage (Redis/Celery).
+        uvicorn.run(
+            "api:app",
+            host="0.0.0.0",
+            port=8000,
+            workers=int(os.getenv("API_WORKERS", "1")),
+            loop="uvloop",
+            http="httptools",
+        )
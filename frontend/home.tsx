@@ -56,11 +56,22 @@ const Home: React.FC = () => {
 
             setProcessingStatus('Running compliance analysis...');
 
-            // Step 2: Process files
+            // Step 2: Start the pipeline job and poll until it finishes
             const processResponse = await axios.post(`${API_BASE}/process`);
+            const jobId = processResponse.data.job_id;
+
+            let job = processResponse.data;
+            while (job.status === 'accepted' || job.status === 'queued' || job.status === 'running') {
+                await new Promise(resolve => setTimeout(resolve, 2000));
+                const statusResponse = await axios.get(`${API_BASE}/status/${jobId}`);
+                job = statusResponse.data;
+                if (job.current_step) {
+                    setProcessingStatus(`Processing: ${job.current_step}...`);
+                }
+            }
 
-            if (processResponse.data.status !== 'completed') {
-                throw new Error(processResponse.data.failed_at || 'Processing failed');
+            if (job.status !== 'completed') {
+                throw new Error(job.failed_at || 'Processing failed');
             }
 
             setProcessingStatus('Fetching results...');
@@ -1,34 +1,40 @@
 """
 Main Pipeline Orchestrator
 Runs all 4 steps sequentially: Extract → Regulation Processing → Bank Extraction → Comparison
+Steps run in-process (imported functions) so heavy libraries and the LLM
+client are loaded once instead of once per subprocess.
 """
 
-import subprocess
 import sys
-from pathlib import Path
 
 
-def run_step(script_name: str, description: str) -> bool:
-    """Run a Python script and return success status."""
+def get_pipeline_steps():
+    """
+    Import the step modules lazily and return [(step_fn, description), ...].
+    Lazy import keeps startup fast for tooling that only imports this module.
+    """
+    from src import s1_extract, s2_llm_process, s3_bank_ext, s4_final
+
+    return [
+        (s1_extract.main, "Step 1: Extracting documents (PDF, DOCX, XLSX)"),
+        (s2_llm_process.main, "Step 2: Processing regulatory clauses"),
+        (s3_bank_ext.main, "Step 3: Extracting bank policy & system rules"),
+        (s4_final.main, "Step 4: Comparing compliance"),
+    ]
+
+
+def run_step(step_fn, description: str) -> bool:
+    """Run a pipeline step function and return success status."""
     print(f"\n{'='*60}")
     print(f"🚀 {description}")
     print(f"{'='*60}")
-    
-    script_path = Path(__file__).parent / "src" / script_name
-    
-    if not script_path.exists():
-        print(f"❌ Script not found: {script_path}")
-        return False
-    
-    result = subprocess.run(
-        [sys.executable, str(script_path)],
-        cwd=Path(__file__).parent
-    )
-    
-    if result.returncode != 0:
-        print(f"❌ {script_name} failed with code {result.returncode}")
+
+    try:
+        step_fn()
+    except Exception as e:
+        print(f"❌ {step_fn.__module__} failed: {e}")
         return False
-    
+
     return True
 
 
@@ -37,18 +43,11 @@ def run_pipeline():
     print("\n" + "="*60)
     print("🏦 COMPLIANCE ENGINE - FULL PIPELINE")
     print("="*60)
-    
-    steps = [
-        ("s1_extract.py", "Step 1: Extracting documents (PDF, DOCX, XLSX)"),
-        ("s2_llm_process.py", "Step 2: Processing regulatory clauses"),
-        ("s3_bank_ext.py", "Step 3: Extracting bank policy & system rules"),
-        ("s4_final.py", "Step 4: Comparing compliance"),
-    ]
-    
-    for script, description in steps:
-        success = run_step(script, description)
+
+    for step_fn, description in get_pipeline_steps():
+        success = run_step(step_fn, description)
         if not success:
-            print(f"\n❌ Pipeline failed at: {script}")
+            print(f"\n❌ Pipeline failed at: {description}")
             return False
     
     print("\n" + "="*60)
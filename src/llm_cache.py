@@ -0,0 +1,78 @@
+"""
+Shared on-disk cache for LLM responses, used by s2/s3/s4.
+
+All pipeline calls run at temperature=0, so identical prompts against the
+same model give identical answers. Responses are stored one file per key
+under intermediate/llm_cache/, keyed by sha256(model + prompt version +
+decoding mode + prompt), which makes re-runs and crash-resumes near-free:
+everything but genuinely new prompts is served from disk.
+
+LLM_CACHE_MODE controls the policy:
+    enabled   - read and write (default)
+    read-only - serve hits but never write (replay prior runs exactly)
+    disabled  - bypass the cache entirely
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+CACHE_DIR = Path(__file__).parent.parent / "intermediate" / "llm_cache"
+
+CACHE_MODE = os.getenv("LLM_CACHE_MODE", "enabled").strip().lower()
+
+
+def make_key(
+    model_name: str, prompt: str, prompt_version: str = "1", mode: str = ""
+) -> str:
+    """Stable cache key for one prompt against one model/prompt revision.
+
+    mode distinguishes client decoding configs (e.g. "json" for Ollama's
+    JSON grammar mode), which produce different responses for the same
+    prompt and must never share entries.
+    """
+    return hashlib.sha256(
+        f"{model_name}\0{prompt_version}\0{mode}\0{prompt}".encode("utf-8")
+    ).hexdigest()
+
+
+def get(key: str) -> Optional[str]:
+    """Return the cached response for a key, or None on a miss."""
+    if CACHE_MODE == "disabled":
+        return None
+
+    cache_file = CACHE_DIR / f"{key}.json"
+    if cache_file.exists():
+        try:
+            return json.loads(cache_file.read_text(encoding="utf-8"))["response"]
+        except (json.JSONDecodeError, KeyError, OSError):
+            pass  # Corrupt/partial entry - treat as a miss
+    return None
+
+
+def set(key: str, response: str) -> None:
+    """Store a response atomically (safe under concurrent workers/crashes)."""
+    if CACHE_MODE in ("disabled", "read-only"):
+        return
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    cache_file = CACHE_DIR / f"{key}.json"
+    tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    tmp_file.write_text(
+        json.dumps({"response": response}, ensure_ascii=False), encoding="utf-8"
+    )
+    os.replace(tmp_file, cache_file)
+
+
+def cached_invoke(
+    llm, prompt: str, model_name: str, prompt_version: str = "1", mode: str = ""
+) -> str:
+    """Invoke the LLM, memoized on disk."""
+    key = make_key(model_name, prompt, prompt_version, mode)
+    response = get(key)
+    if response is None:
+        response = llm.invoke(prompt)
+        set(key, response)
+    return response
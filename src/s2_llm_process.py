@@ -5,17 +5,37 @@ Guarantees consistent JSON output schema regardless of input format.
 """
 
 import json
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+
+try:
+    from src import llm_cache
+except ImportError:  # Run directly as a script (python src/s2_llm_process.py)
+    import llm_cache
 from langchain_ollama import OllamaLLM
 from datetime import datetime
 from typing import Optional
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional C-accelerated encoder
+    orjson = None
+
 # =====================================================
 # CONFIG
 # =====================================================
 MODEL_NAME = "qwen2.5:3b-instruct"
 
+# Concurrent LLM requests. Calls are HTTP-bound so threads are enough.
+# To actually serve them in parallel, OLLAMA_NUM_PARALLEL must be set in
+# the Ollama *server's* environment (it's a server-side setting - setting
+# it here in the client process has no effect); otherwise the server
+# queues the requests.
+LLM_MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", "4"))
+
 # =====================================================
 # GUARANTEED OUTPUT SCHEMA
 # =====================================================
@@ -50,9 +70,40 @@ THRESHOLD_SCHEMA = {
 }
 
 # =====================================================
-# INIT LLM
+# INIT LLM (lazy singleton)
+# =====================================================
+@lru_cache(maxsize=1)
+def get_llm():
+    """Lazily create and reuse a single OllamaLLM client.
+
+    keep_alive pins the model in server memory between calls (no 1-5s
+    reload stalls); num_predict caps runaway generation while leaving
+    room for the fused per-chunk clause arrays; num_ctx bounds the
+    prompt window to the chunk size.
+    """
+    return OllamaLLM(
+        model=MODEL_NAME,
+        temperature=0,
+        keep_alive="30m",
+        num_predict=2048,
+        num_ctx=4096,
+    )
+
+
+# =====================================================
+# LLM RESPONSE CACHE (shared module, see llm_cache.py)
 # =====================================================
-llm = OllamaLLM(model=MODEL_NAME, temperature=0)
+# Bump PROMPT_VERSION whenever a prompt template changes.
+PROMPT_VERSION = "1"
+
+# One timestamp per run: every clause from the same extraction batch
+# shares it, instead of a datetime.now() syscall per clause
+_BATCH_TS = datetime.now().isoformat()
+
+
+def cached_invoke(prompt: str) -> str:
+    """Invoke the LLM, memoized on disk under intermediate/llm_cache/."""
+    return llm_cache.cached_invoke(get_llm(), prompt, MODEL_NAME, PROMPT_VERSION)
 
 # =====================================================
 # LLM PROMPTS - DESIGNED FOR ANY FORMAT
@@ -87,6 +138,58 @@ TEXT:
 {text}
 """
 
+CHUNK_EXTRACTION_PROMPT = """
+You are a regulatory compliance expert. The text below may contain ONE OR MORE distinct regulatory clauses. Identify every clause and extract ALL available structured information from each one in a single pass.
+
+CRITICAL INSTRUCTIONS:
+1. Look for ANY identifying codes (e.g., REG-MORT-001, Article 5.2, §12.3, Clause 4.1.a)
+2. Look for ANY act/law names (e.g., "Mortgage Lending Standards Act", "AML Directive")
+3. Look for ANY dates in any format and convert to YYYY-MM-DD
+4. Look for ALL numeric requirements - percentages, counts, durations, amounts
+5. For boolean requirements (mandatory, required, must have), create a threshold with operator EQUALS and value "true"
+6. Include each clause's own verbatim text as "source_text"
+
+Return a JSON array with ONE OBJECT PER CLAUSE. Each object must have EXACTLY these fields (use null for missing values):
+
+[
+    {{
+        "clause_code": "string or null - ANY code/reference number found (REG-XXX-NNN, Art. N, §N.N, Section N.N)",
+        "clause_title": "string or null - title of this specific rule if stated",
+        "regulation_name": "string or null - the parent act/law/regulation name",
+        "section": "string or null - section/article/paragraph reference (e.g., '4.1.a', '12.3')",
+        "effective_date": "string or null - any date found, converted to YYYY-MM-DD",
+        "category": "string - one of: MORTGAGE, KYC_AML, LENDING, ENVIRONMENTAL, CONSUMER_PROTECTION, DATA_PRIVACY, CAPITAL, LIQUIDITY, INSURANCE, REPORTING, OTHER",
+        "description": "string - the full requirement text",
+        "applies_to": "string or null - who/what this rule applies to",
+        "conditions": "string or null - triggering conditions (e.g., 'Credit Score < 600')",
+        "thresholds": [
+            {{
+                "parameter": "string - metric name in snake_case (e.g., ltv_ratio, min_id_count)",
+                "value": "string - the limit value (use 'true'/'false' for boolean requirements)",
+                "operator": "string - LTE (max/not exceed), GTE (min/at least), EQUALS (must be/required), LT (<), GT (>)",
+                "unit": "string or null - %, count, years, days, currency, boolean, etc.",
+                "human_readable": "string - clear summary (e.g., 'Max LTV 80%')"
+            }}
+        ],
+        "compliance_check": "string - how to verify compliance",
+        "risk_level": "string - HIGH (financial/legal risk), MEDIUM (operational risk), LOW (documentation only)",
+        "source_text": "string - the verbatim text of this clause, including codes and dates"
+    }}
+]
+
+THRESHOLD EXTRACTION RULES:
+- "shall not exceed 80%" → operator: LTE, value: "80"
+- "at least two" → operator: GTE, value: "2"
+- "must not exceed 43%" → operator: LTE, value: "43"
+- "mandatory/required" → operator: EQUALS, value: "true"
+- "capped at 75%" → operator: LTE, value: "75"
+
+TEXT:
+{text}
+
+Return ONLY a valid JSON array, no explanations:
+"""
+
 CLAUSE_EXTRACTION_PROMPT = """
 You are a regulatory compliance expert. Extract ALL available structured information from this regulatory clause.
 
@@ -135,6 +238,21 @@ CLAUSE TEXT:
 Return ONLY valid JSON, no explanations:
 """
 
+# =====================================================
+# PRECOMPILED PATTERNS (same set as s3)
+# =====================================================
+# Compiled once at import instead of re-parsed on every call.
+_NUMERIC_CLEAN_RE = re.compile(r"[%$€₹,\s]")
+# Section headers or paragraph breaks, combined so chunking needs a
+# single pass over the text.
+_CHUNK_SPLIT_RE = re.compile(
+    r'\n(?=(?:Article|Section|§|\d+\.\d+|[A-Z]+-[A-Z]+-\d+))|\n\n+'
+)
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
+_JSON_DECODER = json.JSONDecoder()
+
+
 # =====================================================
 # JSON UTILITIES
 # =====================================================
@@ -144,44 +262,58 @@ def recover_json(text: str):
         return None
 
     text = text.strip()
-    
-    # Try direct parse
-    try:
-        return json.loads(text)
-    except:
-        pass
 
-    # Try to find JSON array
-    match = re.search(r"\[.*\]", text, re.DOTALL)
-    if match:
+    # Try direct parse (orjson decodes ~2x faster when available)
+    if orjson is not None:
         try:
-            return json.loads(match.group())
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    else:
+        try:
+            return json.loads(text)
         except:
             pass
 
-    # Try to find JSON object
-    match = re.search(r"\{.*\}", text, re.DOTALL)
-    if match:
+    # Parse the first JSON value embedded in surrounding prose.
+    # raw_decode consumes exactly one value in linear time - no
+    # DOTALL ".*" regex scans that can backtrack on large outputs.
+    start = next((i for i, c in enumerate(text) if c in "{["), -1)
+    if start != -1:
         try:
-            return json.loads(match.group())
-        except:
+            value, _ = _JSON_DECODER.raw_decode(text, start)
+            return value
+        except json.JSONDecodeError:
             pass
 
     return None
 
 
+# Precomputed per-schema (template, list_keys) pairs: dict.copy() is a
+# C-level table copy, far cheaper than probing schema.items() key by key
+# for every clause and threshold. List defaults are re-initialized after
+# the copy since .copy() is shallow.
+_SCHEMA_TEMPLATES = {
+    id(schema): (
+        dict(schema),
+        tuple(k for k, v in schema.items() if isinstance(v, list)),
+    )
+    for schema in (CLAUSE_SCHEMA, THRESHOLD_SCHEMA)
+}
+
+
 def ensure_schema(data: dict, schema: dict) -> dict:
     """
     Ensure output matches schema exactly.
     Missing fields are set to schema defaults, extra fields are removed.
     """
-    result = {}
-    for key, default in schema.items():
-        if key in data and data[key] is not None:
-            result[key] = data[key]
-        else:
-            # Use a copy of default to avoid mutation issues with lists
-            result[key] = [] if isinstance(default, list) else default
+    template, list_keys = _SCHEMA_TEMPLATES[id(schema)]
+    result = template.copy()
+    for key in list_keys:
+        result[key] = []
+    for key, value in data.items():
+        if value is not None and key in result:
+            result[key] = value
     return result
 
 
@@ -190,6 +322,15 @@ def ensure_threshold_schema(data: dict) -> dict:
     return ensure_schema(data, THRESHOLD_SCHEMA)
 
 
+def write_json(path: Path, data) -> None:
+    """Write indented JSON, via orjson's C encoder when available."""
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+
 def parse_numeric_value(value: str):
     """Try to parse a string value to numeric type for comparison."""
     if value is None:
@@ -204,7 +345,7 @@ def parse_numeric_value(value: str):
         return False
     
     # Numeric - remove common suffixes
-    cleaned = re.sub(r"[%$€₹,\s]", "", value_str)
+    cleaned = _NUMERIC_CLEAN_RE.sub("", value_str)
     try:
         return float(cleaned)
     except:
@@ -219,51 +360,53 @@ def smart_chunk_text(text: str, max_chunk_size: int = 2000) -> list[str]:
     Split text into manageable chunks for LLM processing.
     Tries to split at natural boundaries (paragraphs, sections).
     """
-    # First, try to split by common section markers
-    section_patterns = [
-        r'\n(?=(?:Article|Section|§|\d+\.\d+|[A-Z]+-[A-Z]+-\d+))',  # Section headers
-        r'\n\n+',  # Double newlines (paragraphs)
-        r'\n(?=[A-Z])',  # Lines starting with capital letters
-    ]
-    
-    chunks = [text]
-    
-    for pattern in section_patterns:
-        new_chunks = []
-        for chunk in chunks:
-            if len(chunk) > max_chunk_size:
-                parts = re.split(pattern, chunk)
-                new_chunks.extend([p.strip() for p in parts if p.strip()])
-            else:
-                new_chunks.append(chunk)
-        chunks = new_chunks
-    
-    # If still too large, just split by size
-    final_chunks = []
-    for chunk in chunks:
-        if len(chunk) > max_chunk_size:
-            # Split by sentences
-            sentences = re.split(r'(?<=[.!?])\s+', chunk)
-            current = ""
-            for sent in sentences:
-                if len(current) + len(sent) > max_chunk_size:
-                    if current:
-                        final_chunks.append(current.strip())
-                    current = sent
+    def _chunks():
+        # Single pass over the text: section headers and paragraph breaks
+        # in one combined pattern, instead of re-walking every chunk once
+        # per pattern. Adjacent pieces are merged back greedily up to
+        # max_chunk_size (same as s3), so a small document still comes
+        # out as one chunk - and one LLM call - instead of one chunk per
+        # boundary.
+        pending = ""
+        for part in _CHUNK_SPLIT_RE.split(text):
+            part = part.strip()
+            if not part:
+                continue
+            if len(pending) + len(part) + 1 <= max_chunk_size:
+                pending = f"{pending}\n{part}" if pending else part
+                continue
+            if pending:
+                yield pending
+            if len(part) <= max_chunk_size:
+                pending = part
+                continue
+            pending = ""
+            # Still too large - split by sentences
+            # List-accumulate and join once: linear total work instead
+            # of a quadratic string rebuild per appended sentence
+            current_parts: list[str] = []
+            current_len = 0
+            for sent in _SENTENCE_RE.split(part):
+                if current_len + len(sent) > max_chunk_size:
+                    if current_parts:
+                        yield " ".join(current_parts).strip()
+                    current_parts = [sent]
+                    current_len = len(sent)
                 else:
-                    current += " " + sent
-            if current:
-                final_chunks.append(current.strip())
-        else:
-            final_chunks.append(chunk)
-    
-    return [c for c in final_chunks if len(c) > 20]  # Filter tiny fragments
+                    current_parts.append(sent)
+                    current_len += len(sent) + 1
+            if current_parts:
+                yield " ".join(current_parts).strip()
+        if pending:
+            yield pending
+
+    return [c for c in _chunks() if len(c) > 20]  # Filter tiny fragments
 
 
 def identify_clauses_with_llm(text: str) -> list[str]:
     """Use LLM to identify and split individual clauses from text."""
     prompt = CHUNK_IDENTIFICATION_PROMPT.format(text=text)
-    response = llm.invoke(prompt)
+    response = cached_invoke(prompt)
     
     clauses = recover_json(response)
     
@@ -277,32 +420,24 @@ def identify_clauses_with_llm(text: str) -> list[str]:
 # =====================================================
 # MAIN EXTRACTION LOGIC
 # =====================================================
-def extract_clause_with_llm(clause_text: str, clause_index: int) -> dict:
-    """
-    Extract structured data from a single clause using LLM.
-    Returns a dict matching CLAUSE_SCHEMA exactly.
-    """
-    prompt = CLAUSE_EXTRACTION_PROMPT.format(clause_text=clause_text)
-    response = llm.invoke(prompt)
-    
-    extracted = recover_json(response)
-    
+def _build_clause(extracted, clause_index: int, fallback_source_text: str) -> dict:
+    """Normalize one extracted clause dict onto CLAUSE_SCHEMA."""
     # Start with empty schema
     result = ensure_schema({}, CLAUSE_SCHEMA)
-    result["source_text"] = clause_text
-    result["extracted_at"] = datetime.now().isoformat()
+    result["source_text"] = fallback_source_text
+    result["extracted_at"] = _BATCH_TS
     result["clause_id"] = f"CLAUSE-{clause_index:03d}"
-    
+
     if isinstance(extracted, dict):
         # Map extracted fields to schema
         for key in CLAUSE_SCHEMA.keys():
             if key in extracted and extracted[key] is not None:
                 result[key] = extracted[key]
-        
+
         # Ensure clause_id uses extracted code if available
         if extracted.get("clause_code"):
             result["clause_id"] = extracted["clause_code"]
-        
+
         # Process thresholds to ensure consistent schema
         if "thresholds" in extracted and isinstance(extracted["thresholds"], list):
             result["thresholds"] = []
@@ -312,37 +447,80 @@ def extract_clause_with_llm(clause_text: str, clause_index: int) -> dict:
                     # Add typed numeric value for comparison
                     threshold["value_numeric"] = parse_numeric_value(threshold.get("value"))
                     result["thresholds"].append(threshold)
-    
+
     return result
 
 
+def extract_clause_with_llm(clause_text: str, clause_index: int) -> dict:
+    """
+    Extract structured data from a single clause using LLM.
+    Returns a dict matching CLAUSE_SCHEMA exactly.
+    """
+    prompt = CLAUSE_EXTRACTION_PROMPT.format(clause_text=clause_text)
+    response = cached_invoke(prompt)
+
+    extracted = recover_json(response)
+
+    return _build_clause(extracted, clause_index, clause_text)
+
+
+def extract_chunk_with_llm(chunk: str) -> Optional[list[dict]]:
+    """
+    Fused single pass: identify AND extract every clause in a chunk with
+    one LLM call instead of one identify call plus one extract call per
+    clause. Returns the raw extracted dicts, or None when the response
+    does not parse as an array (caller falls back to the two-pass path).
+    """
+    prompt = CHUNK_EXTRACTION_PROMPT.format(text=chunk)
+    response = cached_invoke(prompt)
+
+    extracted = recover_json(response)
+
+    if isinstance(extracted, list):
+        return [e for e in extracted if isinstance(e, dict)]
+    return None
+
+
 def process_regulation_text(text: str) -> list[dict]:
     """
     Main processing pipeline for regulation text.
     Returns list of clauses, each matching CLAUSE_SCHEMA exactly.
     """
-    all_clauses = []
-    clause_index = 1
-    
     # Step 1: Smart chunk the text
     print("   Chunking text...")
     chunks = smart_chunk_text(text)
     print(f"   Created {len(chunks)} chunks")
-    
-    # Step 2: For each chunk, identify individual clauses
-    print("   Identifying clauses...")
-    for chunk in chunks:
-        clause_texts = identify_clauses_with_llm(chunk)
-        
-        # Step 3: Extract structured data from each clause
-        for clause_text in clause_texts:
-            if len(clause_text.strip()) < 30:
+
+    # Step 2: One fused identify+extract LLM call per chunk - half the
+    # round-trips of the old identify-then-extract pipeline. Calls run
+    # concurrently; executor.map preserves input order, so clause
+    # numbering stays deterministic.
+    print("   Extracting clauses (fused single pass)...")
+    all_clauses = []
+    clause_index = 1
+
+    with ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS) as executor:
+        for chunk, fused in zip(chunks, executor.map(extract_chunk_with_llm, chunks)):
+            if fused is not None:
+                for extracted in fused:
+                    clause_data = _build_clause(
+                        extracted, clause_index,
+                        extracted.get("source_text") or chunk
+                    )
+                    all_clauses.append(clause_data)
+                    clause_index += 1
                 continue
-                
-            clause_data = extract_clause_with_llm(clause_text, clause_index)
-            all_clauses.append(clause_data)
-            clause_index += 1
-    
+
+            # Fallback: the fused response didn't parse - run this chunk
+            # through the original two-pass identify/extract path
+            for clause_text in identify_clauses_with_llm(chunk):
+                if len(clause_text.strip()) < 30:
+                    continue
+                all_clauses.append(
+                    extract_clause_with_llm(clause_text, clause_index)
+                )
+                clause_index += 1
+
     return all_clauses
 
 
@@ -353,22 +531,25 @@ def validate_and_dedupe(clauses: list[dict]) -> list[dict]:
     """
     Validate extracted clauses and remove duplicates.
     """
-    seen_texts = set()
+    # Store 8-byte int hashes instead of the 100-char prefixes: half the
+    # memory and cheaper membership checks. A 64-bit collision across a
+    # few thousand clauses is vanishingly unlikely.
+    seen_keys: set[int] = set()
     valid_clauses = []
-    
+
     for clause in clauses:
         # Skip if no meaningful content
         if not clause.get("description") and not clause.get("source_text"):
             continue
-        
+
         # Simple deduplication by source text
-        text_key = (clause.get("source_text") or "")[:100]
-        if text_key in seen_texts:
+        key = hash((clause.get("source_text") or "")[:100])
+        if key in seen_keys:
             continue
-        seen_texts.add(text_key)
-        
+        seen_keys.add(key)
+
         valid_clauses.append(clause)
-    
+
     return valid_clauses
 
 
@@ -411,14 +592,12 @@ def main():
     
     # 1. Full extracted clauses (intermediate)
     clauses_output = intermediate_dir / "clauses_extracted.json"
-    with open(clauses_output, 'w', encoding='utf-8') as f:
-        json.dump(clauses, f, indent=2, ensure_ascii=False)
+    write_json(clauses_output, clauses)
     print(f"\n✓ Saved: {clauses_output}")
-    
+
     # 2. Compliance rules (final, same schema as clauses for consistency)
     rules_output = output_dir / "regulatory_rules.json"
-    with open(rules_output, 'w', encoding='utf-8') as f:
-        json.dump(clauses, f, indent=2, ensure_ascii=False)
+    write_json(rules_output, clauses)
     print(f"✓ Saved: {rules_output}")
     
     
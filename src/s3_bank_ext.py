@@ -6,17 +6,34 @@ Outputs: bank_policy_rules.json and system_rules.json
 """
 
 import json
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+
+try:
+    from src import llm_cache
+except ImportError:  # Run directly as a script (python src/s3_bank_ext.py)
+    import llm_cache
 from langchain_ollama import OllamaLLM
 from datetime import datetime
 from typing import Optional
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional C-accelerated encoder
+    orjson = None
+
 # =====================================================
 # CONFIG
 # =====================================================
 MODEL_NAME = "qwen2.5:3b-instruct"
 
+# Concurrent LLM requests (HTTP-bound, so threads suffice); matches the
+# pattern in s2
+LLM_MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", "8"))
+
 # =====================================================
 # GUARANTEED OUTPUT SCHEMA
 # =====================================================
@@ -49,9 +66,60 @@ THRESHOLD_SCHEMA = {
 }
 
 # =====================================================
-# INIT LLM
+# INIT LLM (lazy singleton, same as s2)
 # =====================================================
-llm = OllamaLLM(model=MODEL_NAME, temperature=0)
+@lru_cache(maxsize=1)
+def get_llm():
+    """Lazily create and reuse a single OllamaLLM client.
+
+    Tuned the same way as s2: keep_alive avoids model reload stalls,
+    num_predict/num_ctx bound response and prompt sizes (with headroom
+    for the batched rule arrays).
+    """
+    return OllamaLLM(
+        model=MODEL_NAME,
+        temperature=0,
+        keep_alive="30m",
+        num_predict=2048,
+        num_ctx=4096,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_json_llm():
+    """JSON-mode client for calls that must return JSON.
+
+    format="json" makes Ollama decode under a JSON grammar, so the
+    identification/extraction responses parse on the first try instead
+    of leaning on recover_json's repair path.
+    """
+    return OllamaLLM(
+        model=MODEL_NAME,
+        temperature=0,
+        keep_alive="30m",
+        num_predict=2048,
+        num_ctx=4096,
+        format="json",
+    )
+
+
+# Bump whenever a prompt template changes (same as s2)
+PROMPT_VERSION = "1"
+
+# One timestamp per run: every rule from the same extraction batch shares
+# it, instead of a datetime.now() syscall per rule (same as s2)
+_BATCH_TS = datetime.now().isoformat()
+
+
+def cached_invoke(prompt: str, json_mode: bool = False) -> str:
+    """Invoke the LLM, memoized on disk under intermediate/llm_cache/."""
+    client = get_json_llm() if json_mode else get_llm()
+    # mode keys the cache per decoding config: a plain-text client's
+    # cached response must not be replayed for the JSON-mode client
+    return llm_cache.cached_invoke(
+        client, prompt, MODEL_NAME, PROMPT_VERSION,
+        mode="json" if json_mode else "",
+    )
 
 # =====================================================
 # LLM PROMPTS
@@ -175,32 +243,78 @@ SYSTEM RULE TEXT:
 Return ONLY valid JSON, no explanations:
 """
 
+# =====================================================
+# PRECOMPILED PATTERNS & KEYWORD SETS
+# =====================================================
+# Compiled once at import so hot paths don't re-parse patterns per call.
+_NUMERIC_CLEAN_RE = re.compile(r"[%$€₹,\s]")
+_CHUNK_SPLIT_RE = re.compile(r'\n(?=(?:\d+\.\d+|Policy|SYS-R-))|\n\n+|\n(?=[A-Z])')
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+# Rule headers as they appear in policy/system documents; used to spot
+# chunks that obviously hold a single rule and skip the LLM split.
+_RULE_HEADER_RE = re.compile(r'(?:SYS-R-\d+|Policy\s+\d+\.\d+|Rule\s+ID[:\s])', re.IGNORECASE)
+
+_TRUE_WORDS = frozenset({"true", "yes", "required", "mandatory"})
+_FALSE_WORDS = frozenset({"false", "no", "optional"})
+
+
 # =====================================================
 # JSON UTILITIES (same as s2)
 # =====================================================
+def _first_json_span(text: str) -> Optional[str]:
+    """
+    Return the first balanced {...} or [...] span in text, or None.
+    A linear scan tracking nesting depth and string state - unlike a
+    greedy DOTALL regex it handles nested brackets correctly and never
+    backtracks on large responses.
+    """
+    start = -1
+    depth = 0
+    in_string = False
+    escaped = False
+
+    for i, c in enumerate(text):
+        if start == -1:
+            if c in "{[":
+                start = i
+                depth = 1
+            continue
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+            continue
+        if c == '"':
+            in_string = True
+        elif c in "{[":
+            depth += 1
+        elif c in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+
+    return None
+
+
 def recover_json(text: str):
     """Robustly extract JSON from LLM response."""
     if not text or not text.strip():
         return None
 
     text = text.strip()
-    
+
     try:
         return json.loads(text)
     except:
         pass
 
-    match = re.search(r"\[.*\]", text, re.DOTALL)
-    if match:
+    span = _first_json_span(text)
+    if span:
         try:
-            return json.loads(match.group())
-        except:
-            pass
-
-    match = re.search(r"\{.*\}", text, re.DOTALL)
-    if match:
-        try:
-            return json.loads(match.group())
+            return json.loads(span)
         except:
             pass
 
@@ -223,6 +337,15 @@ def ensure_threshold_schema(data: dict) -> dict:
     return ensure_schema(data, THRESHOLD_SCHEMA)
 
 
+def write_json(path: Path, data) -> None:
+    """Write indented JSON, via orjson's C encoder when available (same as s2)."""
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+
 def parse_numeric_value(value: str):
     """Try to parse a string value to numeric type."""
     if value is None:
@@ -230,12 +353,12 @@ def parse_numeric_value(value: str):
     
     value_str = str(value).strip().lower()
     
-    if value_str in ["true", "yes", "required", "mandatory"]:
+    if value_str in _TRUE_WORDS:
         return True
-    if value_str in ["false", "no", "optional"]:
+    if value_str in _FALSE_WORDS:
         return False
     
-    cleaned = re.sub(r"[%$€₹,\s]", "", value_str)
+    cleaned = _NUMERIC_CLEAN_RE.sub("", value_str)
     try:
         return float(cleaned)
     except:
@@ -247,48 +370,59 @@ def parse_numeric_value(value: str):
 # =====================================================
 def smart_chunk_text(text: str, max_chunk_size: int = 2000) -> list[str]:
     """Split text into manageable chunks."""
-    section_patterns = [
-        r'\n(?=(?:\d+\.\d+|Policy|SYS-R-))',
-        r'\n\n+',
-        r'\n(?=[A-Z])',
-    ]
-    
-    chunks = [text]
-    
-    for pattern in section_patterns:
-        new_chunks = []
-        for chunk in chunks:
-            if len(chunk) > max_chunk_size:
-                parts = re.split(pattern, chunk)
-                new_chunks.extend([p.strip() for p in parts if p.strip()])
-            else:
-                new_chunks.append(chunk)
-        chunks = new_chunks
-    
-    final_chunks = []
-    for chunk in chunks:
-        if len(chunk) > max_chunk_size:
-            sentences = re.split(r'(?<=[.!?])\s+', chunk)
-            current = ""
-            for sent in sentences:
-                if len(current) + len(sent) > max_chunk_size:
-                    if current:
-                        final_chunks.append(current.strip())
-                    current = sent
+    def _chunks():
+        # One combined split pass instead of re-walking every chunk once
+        # per section pattern. The capital-letter alternative breaks at
+        # nearly every line, so adjacent pieces are merged back greedily
+        # up to max_chunk_size rather than emitted as tiny fragments.
+        pending = ""
+        for part in _CHUNK_SPLIT_RE.split(text):
+            part = part.strip()
+            if not part:
+                continue
+            if len(pending) + len(part) + 1 <= max_chunk_size:
+                pending = f"{pending}\n{part}" if pending else part
+                continue
+            if pending:
+                yield pending
+            if len(part) <= max_chunk_size:
+                pending = part
+                continue
+            pending = ""
+            # Still too large - split by sentences
+            # List-accumulate and join once: linear total work instead
+            # of a quadratic string rebuild per appended sentence
+            current_parts: list[str] = []
+            current_len = 0
+            for sent in _SENTENCE_RE.split(part):
+                if current_len + len(sent) > max_chunk_size:
+                    if current_parts:
+                        yield " ".join(current_parts).strip()
+                    current_parts = [sent]
+                    current_len = len(sent)
                 else:
-                    current += " " + sent
-            if current:
-                final_chunks.append(current.strip())
-        else:
-            final_chunks.append(chunk)
-    
-    return [c for c in final_chunks if len(c) > 20]
+                    current_parts.append(sent)
+                    current_len += len(sent) + 1
+            if current_parts:
+                yield " ".join(current_parts).strip()
+        if pending:
+            yield pending
+
+    return [c for c in _chunks() if len(c) > 20]
 
 
 def identify_rules_with_llm(text: str) -> list[str]:
     """Use LLM to identify and split individual rules from text."""
+    if not text.strip():
+        return []
+
+    # Fast path: a chunk with at most one rule header has nothing to
+    # split - skip the identification LLM call entirely
+    if len(_RULE_HEADER_RE.findall(text)) <= 1:
+        return [text]
+
     prompt = CHUNK_IDENTIFICATION_PROMPT.format(text=text)
-    response = llm.invoke(prompt)
+    response = cached_invoke(prompt, json_mode=True)
     
     rules = recover_json(response)
     
@@ -301,27 +435,22 @@ def identify_rules_with_llm(text: str) -> list[str]:
 # =====================================================
 # EXTRACTION LOGIC
 # =====================================================
-def extract_policy_rule(rule_text: str, rule_index: int) -> dict:
-    """Extract structured data from a policy rule using LLM."""
-    prompt = POLICY_EXTRACTION_PROMPT.format(clause_text=rule_text)
-    response = llm.invoke(prompt)
-    
-    extracted = recover_json(response)
-    
+def _build_rule(extracted, rule_index: int, rule_text: str, source: str) -> dict:
+    """Normalize one extracted rule dict onto RULE_SCHEMA."""
     result = ensure_schema({}, RULE_SCHEMA)
     result["source_text"] = rule_text
-    result["extracted_at"] = datetime.now().isoformat()
-    result["rule_id"] = f"POLICY-{rule_index:03d}"
-    result["source"] = "POLICY"
-    
+    result["extracted_at"] = _BATCH_TS
+    result["rule_id"] = f"{source}-{rule_index:03d}"
+    result["source"] = source
+
     if isinstance(extracted, dict):
         for key in RULE_SCHEMA.keys():
             if key in extracted and extracted[key] is not None:
                 result[key] = extracted[key]
-        
+
         if extracted.get("rule_code"):
             result["rule_id"] = extracted["rule_code"]
-        
+
         if "thresholds" in extracted and isinstance(extracted["thresholds"], list):
             result["thresholds"] = []
             for t in extracted["thresholds"]:
@@ -329,82 +458,164 @@ def extract_policy_rule(rule_text: str, rule_index: int) -> dict:
                     threshold = ensure_threshold_schema(t)
                     threshold["value_numeric"] = parse_numeric_value(threshold.get("value"))
                     result["thresholds"].append(threshold)
-    
+
     return result
 
 
+def extract_policy_rule(rule_text: str, rule_index: int) -> dict:
+    """Extract structured data from a policy rule using LLM."""
+    prompt = POLICY_EXTRACTION_PROMPT.format(clause_text=rule_text)
+    response = cached_invoke(prompt, json_mode=True)
+
+    return _build_rule(recover_json(response), rule_index, rule_text, "POLICY")
+
+
 def extract_system_rule(rule_text: str, rule_index: int) -> dict:
     """Extract structured data from a system rule using LLM."""
     prompt = SYSTEM_RULE_EXTRACTION_PROMPT.format(clause_text=rule_text)
-    response = llm.invoke(prompt)
-    
+    response = cached_invoke(prompt, json_mode=True)
+
+    return _build_rule(recover_json(response), rule_index, rule_text, "SYSTEM")
+
+
+
+# Per-extractor prompt template and rule-id prefix, used by the batch path
+_EXTRACTOR_CONFIG = {
+    extract_policy_rule: (POLICY_EXTRACTION_PROMPT, "POLICY"),
+    extract_system_rule: (SYSTEM_RULE_EXTRACTION_PROMPT, "SYSTEM"),
+}
+
+# Batched LLM calls are bounded both by rule count and by total rule
+# text: at ~4 chars/token, 6000 chars of rules plus the prompt template
+# and a full response array stay inside the clients' num_ctx=4096 and
+# num_predict=2048. A count cap alone let 8 near-max chunks (~15k chars)
+# overflow the context, silently truncating the prompt.
+BATCH_SIZE = 8
+BATCH_CHAR_BUDGET = 6000
+
+_BATCH_SUFFIX = """
+
+NOTE: The RULE TEXT above contains {n} separate rules, numbered RULE 1 through RULE {n}.
+Apply the extraction instructions to EACH rule independently and return a JSON array
+of exactly {n} objects, in the same order as the numbered rules.
+Return ONLY a valid JSON array, no explanations:
+"""
+
+
+def extract_rules_batch(rule_texts: list[str], extractor_func) -> Optional[list]:
+    """
+    Extract several rules with ONE LLM call: the shared prompt header is
+    sent once and the rules are appended as numbered blocks. Returns the
+    raw extracted dicts in input order, or None when the response does
+    not parse as an array of the right length (caller falls back to
+    per-rule extraction).
+    """
+    prompt_template, _ = _EXTRACTOR_CONFIG[extractor_func]
+
+    numbered = "\n\n".join(
+        f"RULE {i + 1}:\n{t}" for i, t in enumerate(rule_texts)
+    )
+    prompt = prompt_template.format(clause_text=numbered) + _BATCH_SUFFIX.format(
+        n=len(rule_texts)
+    )
+    response = cached_invoke(prompt, json_mode=True)
+
     extracted = recover_json(response)
-    
-    result = ensure_schema({}, RULE_SCHEMA)
-    result["source_text"] = rule_text
-    result["extracted_at"] = datetime.now().isoformat()
-    result["rule_id"] = f"SYSTEM-{rule_index:03d}"
-    result["source"] = "SYSTEM"
-    
-    if isinstance(extracted, dict):
-        for key in RULE_SCHEMA.keys():
-            if key in extracted and extracted[key] is not None:
-                result[key] = extracted[key]
-        
-        if extracted.get("rule_code"):
-            result["rule_id"] = extracted["rule_code"]
-        
-        if "thresholds" in extracted and isinstance(extracted["thresholds"], list):
-            result["thresholds"] = []
-            for t in extracted["thresholds"]:
-                if isinstance(t, dict):
-                    threshold = ensure_threshold_schema(t)
-                    threshold["value_numeric"] = parse_numeric_value(threshold.get("value"))
-                    result["thresholds"].append(threshold)
-    
-    return result
+
+    if isinstance(extracted, list) and len(extracted) == len(rule_texts):
+        return extracted
+    return None
+
+
+def _build_batches(rule_texts: list[str]) -> list[list[str]]:
+    """
+    Greedily pack rules into batches of at most BATCH_SIZE rules and
+    BATCH_CHAR_BUDGET characters of rule text. A single rule over the
+    budget still gets its own batch (it fits alone - chunks are capped
+    well below the budget anyway).
+    """
+    batches: list[list[str]] = []
+    batch: list[str] = []
+    batch_chars = 0
+
+    for rule_text in rule_texts:
+        if batch and (
+            len(batch) >= BATCH_SIZE
+            or batch_chars + len(rule_text) > BATCH_CHAR_BUDGET
+        ):
+            batches.append(batch)
+            batch = []
+            batch_chars = 0
+        batch.append(rule_text)
+        batch_chars += len(rule_text)
+
+    if batch:
+        batches.append(batch)
+    return batches
 
 
 def process_text(text: str, extractor_func, source_name: str) -> list[dict]:
     """Process text and extract rules using the specified extractor."""
-    all_rules = []
-    rule_index = 1
-    
     print("   Chunking text...")
     chunks = smart_chunk_text(text)
     print(f"   Created {len(chunks)} chunks")
-    
-    print("   Identifying rules...")
-    for chunk in chunks:
-        rule_texts = identify_rules_with_llm(chunk)
-        
-        for rule_text in rule_texts:
-            if len(rule_text.strip()) < 30:
-                continue
-            
-            rule_data = extractor_func(rule_text, rule_index)
-            all_rules.append(rule_data)
-            rule_index += 1
-    
+
+    # LLM calls block on network I/O, so run them concurrently;
+    # executor.map preserves input order for deterministic numbering
+    with ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS) as executor:
+        print("   Identifying rules...")
+        rule_texts = []
+        for texts in executor.map(identify_rules_with_llm, chunks):
+            rule_texts.extend(t for t in texts if len(t.strip()) >= 30)
+
+        # Extract in batches: one LLM round-trip per batch instead of
+        # one per rule, with the shared prompt header sent once per
+        # batch - and the batches themselves run in parallel. Batches
+        # are packed by count AND character budget so the worst case
+        # still fits the model context (see BATCH_CHAR_BUDGET).
+        batches = _build_batches(rule_texts)
+        batch_results = list(executor.map(
+            lambda b: extract_rules_batch(b, extractor_func), batches
+        ))
+
+    _, source = _EXTRACTOR_CONFIG[extractor_func]
+    all_rules = []
+    rule_index = 1
+
+    for batch_texts, batch in zip(batches, batch_results):
+        if batch is not None:
+            for extracted, rule_text in zip(batch, batch_texts):
+                all_rules.append(
+                    _build_rule(extracted, rule_index, rule_text, source)
+                )
+                rule_index += 1
+        else:
+            # Fallback: the batched response didn't parse - extract this
+            # batch rule by rule
+            for rule_text in batch_texts:
+                all_rules.append(extractor_func(rule_text, rule_index))
+                rule_index += 1
+
     return all_rules
 
 
 def validate_and_dedupe(rules: list[dict]) -> list[dict]:
     """Validate and deduplicate extracted rules."""
-    seen_texts = set()
+    # Int-hash dedupe keys (same as s2)
+    seen_keys: set[int] = set()
     valid_rules = []
-    
+
     for rule in rules:
         if not rule.get("description") and not rule.get("source_text"):
             continue
-        
-        text_key = (rule.get("source_text") or "")[:100]
-        if text_key in seen_texts:
+
+        key = hash((rule.get("source_text") or "")[:100])
+        if key in seen_keys:
             continue
-        seen_texts.add(text_key)
-        
+        seen_keys.add(key)
+
         valid_rules.append(rule)
-    
+
     return valid_rules
 
 
@@ -440,8 +651,7 @@ def main():
         
         # Save policy rules
         policy_output = final_dir / "bank_policy_rules.json"
-        with open(policy_output, 'w', encoding='utf-8') as f:
-            json.dump(policy_rules, f, indent=2, ensure_ascii=False)
+        write_json(policy_output, policy_rules)
         print(f"   ✓ Saved: {policy_output}")
     else:
         print(f"\n⚠️ Policy file not found: {policy_file}")
@@ -464,8 +674,7 @@ def main():
         
         # Save system rules
         system_output = final_dir / "system_rules.json"
-        with open(system_output, 'w', encoding='utf-8') as f:
-            json.dump(system_rules, f, indent=2, ensure_ascii=False)
+        write_json(system_output, system_rules)
         print(f"   ✓ Saved: {system_output}")
     else:
         print(f"\n⚠️ System rules file not found: {system_file}")
@@ -6,52 +6,133 @@ Uses semantic matching for parameter comparison.
 
 import json
 import csv
+import gzip
+import os
+import pickle
 import re
+import shutil
+import sys
+import threading
+from array import array
+from functools import lru_cache, partial
 from pathlib import Path
 from typing import Optional
 from difflib import SequenceMatcher
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from langchain_ollama import OllamaLLM
 
+try:
+    from src import llm_cache
+except ImportError:  # Run directly as a script (python src/s4_final.py)
+    import llm_cache
+
+try:
+    from rapidfuzz import fuzz as _rf_fuzz
+except ImportError:  # pragma: no cover - optional C++-accelerated matcher
+    _rf_fuzz = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional C-accelerated decoder
+    orjson = None
+
+try:
+    import pandas as pd
+except ImportError:  # pragma: no cover - optional C-engine CSV writer
+    pd = None
+
 # =====================================================
 # CONFIG
 # =====================================================
 MODEL_NAME = "qwen2.5:3b-instruct"
 USE_LLM_FOR_MATCHING = True  # Set to False for pure string matching (faster but less accurate)
 
+# Compliance statuses flow through the pipeline as small ints (compact
+# array storage, C-speed counts); _STATUS_LABELS maps them back to the
+# report strings at CSV-write time only
+STATUS_NO, STATUS_YES, STATUS_NA = 0, 1, 2
+_STATUS_LABELS = ("No", "Yes", "N/A")
+
+# Reports at or above this row count go through pandas' C csv engine;
+# smaller ones stay on csv.writer to skip DataFrame construction
+CSV_PANDAS_THRESHOLD = 10_000
+
+# Comparison threads: each rule is independent and dominated by LLM
+# round-trips, so threads give near-linear speedup (same pattern as
+# LLM_MAX_WORKERS in s2/s3).
+COMPARE_MAX_WORKERS = int(os.getenv("COMPARE_MAX_WORKERS", "8"))
+
 
 # =====================================================
 # GENERALIZED PARAMETER MATCHING
 # =====================================================
+# Precompiled patterns: these run inside find_best_match's O(N*M) loop,
+# so skip the re-cache lookup on every call.
+_NORMALIZE_RE = re.compile(r'[^a-z0-9]')
+_WORD_SPLIT_RE = re.compile(r'[_\s]+')
+_ALPHA_RUN_RE = re.compile(r'[a-z]+')
+
+
+def _normalize_lowered(text_lower: str) -> str:
+    """Strip non-alphanumerics from already-lowercased text."""
+    return _NORMALIZE_RE.sub('', text_lower)
+
+
+@lru_cache(maxsize=4096)
 def normalize_text(text: str) -> str:
     """Normalize text for comparison - lowercase, remove special chars."""
     if not text:
         return ""
-    return re.sub(r'[^a-z0-9]', '', text.lower())
+    return _normalize_lowered(text.lower())
 
 
-def get_words(param: str) -> set:
-    """Extract meaningful words from a parameter name."""
-    if not param:
-        return set()
+def _get_words_lowered(param_lower: str) -> set:
+    """Extract meaningful words from an already-lowercased parameter name."""
     # Split on underscores, camelCase, numbers
-    words = re.split(r'[_\s]+', param.lower())
+    words = _WORD_SPLIT_RE.split(param_lower)
     # Also split camelCase
     expanded = []
     for word in words:
-        expanded.extend(re.findall(r'[a-z]+', word))
-    # Filter out very short words and common suffixes
-    meaningful = {w for w in expanded if len(w) > 2 and w not in {'max', 'min', 'count', 'ratio', 'value'}}
+        expanded.extend(_ALPHA_RUN_RE.findall(word))
+    # Filter out very short words and common suffixes; frozenset so the
+    # result is hashable and safe to share between cached callers
+    meaningful = frozenset(
+        w for w in expanded if len(w) > 2 and w not in {'max', 'min', 'count', 'ratio', 'value'}
+    )
     return meaningful
 
 
+@lru_cache(maxsize=4096)
+def get_words(param: str) -> frozenset:
+    """Extract meaningful words from a parameter name."""
+    if not param:
+        return frozenset()
+    return _get_words_lowered(param.lower())
+
+
 def string_similarity(s1: str, s2: str) -> float:
     """Calculate string similarity using multiple methods."""
     if not s1 or not s2:
         return 0.0
-    
-    n1 = normalize_text(s1)
-    n2 = normalize_text(s2)
+
+    # Parameters come from a small vocabulary, so the same pairs recur
+    # constantly inside the matching loop - memoize, with the arguments
+    # ordered so (a, b) and (b, a) share one cache slot.
+    if s1 > s2:
+        s1, s2 = s2, s1
+    return _sim_cached(s1, s2)
+
+
+@lru_cache(maxsize=8192)
+def _sim_cached(s1: str, s2: str) -> float:
+    """Uncached body of string_similarity (args pre-ordered)."""
+    # Lowercase once per string; every helper below works on the
+    # pre-lowered copy instead of re-allocating its own.
+    l1 = s1.lower()
+    l2 = s2.lower()
+
+    n1 = _normalize_lowered(l1)
+    n2 = _normalize_lowered(l2)
     
     if not n1 or not n2:
         return 0.0
@@ -65,8 +146,8 @@ def string_similarity(s1: str, s2: str) -> float:
         return 0.85
     
     # Word overlap (most important for parameter matching)
-    words1 = get_words(s1)
-    words2 = get_words(s2)
+    words1 = _get_words_lowered(l1)
+    words2 = _get_words_lowered(l2)
     
     if words1 and words2:
         overlap = words1 & words2
@@ -74,7 +155,10 @@ def string_similarity(s1: str, s2: str) -> float:
             jaccard = len(overlap) / len(words1 | words2)
             return max(0.7, jaccard)  # At least 0.7 if any word matches
     
-    # Sequence matching as fallback
+    # Sequence matching as fallback (rapidfuzz is C++-backed and 20-100x
+    # faster than pure-Python SequenceMatcher on this path)
+    if _rf_fuzz is not None:
+        return _rf_fuzz.ratio(n1, n2) / 100.0
     return SequenceMatcher(None, n1, n2).ratio()
 
 
@@ -153,12 +237,14 @@ def compare_thresholds(
     if reg_val is None or cmp_val is None:
         return True, "Cannot compare (missing value)"
     
-    # Convert to float
-    try:
-        reg_val = float(reg_val)
-        cmp_val = float(cmp_val)
-    except (TypeError, ValueError):
-        return True, "Cannot compare (non-numeric)"
+    # value_numeric is already typed upstream (parse_numeric_value), so the
+    # common case skips conversion - and the try/except - entirely
+    if not isinstance(reg_val, (int, float)) or not isinstance(cmp_val, (int, float)):
+        try:
+            reg_val = float(reg_val)
+            cmp_val = float(cmp_val)
+        except (TypeError, ValueError):
+            return True, "Cannot compare (non-numeric)"
     
     # Comparison based on operator type
     if reg_op in ["<=", "<"]:
@@ -193,16 +279,45 @@ llm = None
 def get_llm():
     global llm
     if llm is None:
-        llm = OllamaLLM(model=MODEL_NAME, temperature=0)
+        # Same tuning as s2/s3: keep the model resident, cap response
+        # length (verdicts are two short lines), bound the context
+        llm = OllamaLLM(
+            model=MODEL_NAME,
+            temperature=0,
+            keep_alive="30m",
+            num_predict=512,
+            num_ctx=4096,
+        )
     return llm
 
 
+# In-process verdict memo keyed by the normalized parameter pair. The
+# disk cache saves the LLM call; this also saves prompt construction and
+# response parsing when the same pair recurs within a run. Guarded by a
+# lock because comparison workers share it across threads.
+_LLM_MATCH_CACHE: dict[tuple[str, str], tuple[bool, float, str]] = {}
+_LLM_MATCH_CACHE_LOCK = threading.Lock()
+
+
+def _match_key(param1: str, param2: str) -> tuple[str, str]:
+    """Order-independent cache key for a parameter pair."""
+    n1 = normalize_text(param1)
+    n2 = normalize_text(param2)
+    return (n1, n2) if n1 <= n2 else (n2, n1)
+
+
 def llm_parameters_match(param1: str, param2: str) -> tuple[bool, float, str]:
     """
     Use LLM to determine if two parameters are semantically related.
     Returns (is_match, confidence, explanation).
     Strict matching - only returns True if absolutely certain.
     """
+    key = _match_key(param1, param2)
+    with _LLM_MATCH_CACHE_LOCK:
+        cached = _LLM_MATCH_CACHE.get(key)
+    if cached is not None:
+        return cached
+
     prompt = f"""Are these two parameter names referring to EXACTLY the same financial metric or requirement?
 
 Parameter 1: {param1}
@@ -217,116 +332,340 @@ ANSWER: yes or no
 REASON: one brief sentence explaining why"""
     
     try:
-        response = get_llm().invoke(prompt).strip()
+        # Memoized on disk - repeat parameter pairs cost zero LLM time
+        response = llm_cache.cached_invoke(get_llm(), prompt, MODEL_NAME).strip()
         lines = response.split('\n')
-        
+
         answer = "no"
         reason = "Could not determine"
-        
+
         for line in lines:
             if line.upper().startswith("ANSWER:"):
                 answer = line.split(":", 1)[1].strip().lower()
             elif line.upper().startswith("REASON:"):
                 reason = line.split(":", 1)[1].strip()
-        
+
         is_match = answer.startswith("yes")
-        return is_match, 0.9 if is_match else 0.1, reason
+        result = (is_match, 0.9 if is_match else 0.1, reason)
+        with _LLM_MATCH_CACHE_LOCK:
+            _LLM_MATCH_CACHE[key] = result
+        return result
     except Exception as e:
+        # Errors are transient - don't memoize them
         return False, 0.0, f"LLM error: {str(e)}"
 
 
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _recover_json(text: str):
+    """Parse the first JSON value embedded in an LLM response (see s2)."""
+    if not text:
+        return None
+    start = next((i for i, c in enumerate(text) if c in "{["), -1)
+    if start != -1:
+        try:
+            value, _ = _JSON_DECODER.raw_decode(text, start)
+            return value
+        except json.JSONDecodeError:
+            pass
+    return None
+
+
+def llm_parameters_match_batch(
+    pairs: list[tuple[str, str]]
+) -> Optional[list[tuple[bool, float, str]]]:
+    """
+    Verify several parameter pairs with ONE LLM call instead of one
+    round-trip each. Returns (is_match, confidence, reason) per pair in
+    input order, or None when the response does not parse (caller falls
+    back to per-pair llm_parameters_match).
+    """
+    # Serve already-seen pairs from the in-process memo; only the
+    # remainder goes into the prompt
+    with _LLM_MATCH_CACHE_LOCK:
+        results: list[Optional[tuple[bool, float, str]]] = [
+            _LLM_MATCH_CACHE.get(_match_key(a, b)) for a, b in pairs
+        ]
+    todo = [i for i, r in enumerate(results) if r is None]
+    if not todo:
+        return results
+
+    numbered = "\n".join(
+        f'{n + 1}. A="{pairs[i][0]}" B="{pairs[i][1]}"'
+        for n, i in enumerate(todo)
+    )
+    prompt = f"""For each numbered pair below, decide whether parameter A and parameter B refer to EXACTLY the same financial metric or requirement.
+
+Rules:
+- Only answer yes if they are EXACTLY the same concept
+- Answer no if they are different, related but not identical, or if unsure
+
+Pairs:
+{numbered}
+
+Return ONLY a JSON array with one object per pair, in the same order:
+[{{"match": "yes or no", "reason": "one brief sentence explaining why"}}]"""
+
+    try:
+        response = llm_cache.cached_invoke(get_llm(), prompt, MODEL_NAME)
+    except Exception:
+        return None
+
+    verdicts = _recover_json(response)
+    if not isinstance(verdicts, list) or len(verdicts) != len(todo):
+        return None
+
+    with _LLM_MATCH_CACHE_LOCK:
+        for i, v in zip(todo, verdicts):
+            if isinstance(v, dict):
+                is_match = str(v.get("match", "no")).strip().lower().startswith("yes")
+                reason = str(v.get("reason") or "Could not determine")
+                result = (is_match, 0.9 if is_match else 0.1, reason)
+                _LLM_MATCH_CACHE[_match_key(*pairs[i])] = result
+            else:
+                result = (False, 0.1, "Could not determine")
+            results[i] = result
+    return results
+
+
 # =====================================================
 # FIND BEST MATCHING THRESHOLD
 # =====================================================
+def build_param_index(thresholds: list[dict]) -> dict[str, list[int]]:
+    """
+    Group threshold indices by normalized parameter name.
+    Lets find_best_match resolve exact-name matches with one dict lookup
+    instead of scoring every candidate.
+    """
+    index: dict[str, list[int]] = {}
+    for i, t in enumerate(thresholds):
+        norm = normalize_text(t.get("parameter", ""))
+        if norm:
+            index.setdefault(norm, []).append(i)
+    return index
+
+
+def _trigram_set(norm: str) -> set:
+    """Character trigrams of a normalized name."""
+    return {norm[i:i + 3] for i in range(len(norm) - 2)}
+
+
+def build_source_arrays(
+    all_source_thresholds: list[dict],
+    source_ids: Optional[list[str]] = None,
+) -> dict:
+    """
+    AoS -> SoA: turn the threshold dicts into parallel arrays (params,
+    normalized params, operators, trigram sets, source rule ids). Built
+    once per source set so the matching loop indexes flat lists instead
+    of doing four dict lookups per candidate per regulatory threshold.
+    """
+    params, norms, ops, trigrams = [], [], [], []
+    vals, norm_ops = [], []
+    for t in all_source_thresholds:
+        p = t.get("parameter") or ""
+        n = normalize_text(p)
+        params.append(p)
+        norms.append(n)
+        ops.append(t.get("operator") or "")
+        trigrams.append(_trigram_set(n))
+        norm_ops.append(normalize_operator(t.get("operator") or ""))
+        v = t.get("value_numeric")
+        vals.append(v if isinstance(v, (int, float)) and not isinstance(v, bool) else None)
+    return {
+        "thresholds": all_source_thresholds,
+        "params": params,
+        "norms": norms,
+        "ops": ops,
+        "trigrams": trigrams,
+        "source_ids": source_ids or [""] * len(all_source_thresholds),
+        "vals": vals,
+        "norm_ops": norm_ops,
+    }
+
+
 def find_best_match(
     reg_threshold: dict,
     candidate_thresholds: list[dict],
-    use_llm: bool = USE_LLM_FOR_MATCHING
+    use_llm: bool = USE_LLM_FOR_MATCHING,
+    param_index: Optional[dict] = None
 ) -> Optional[tuple[dict, float]]:
     """
     Find the best matching threshold from candidates.
     Returns (best_match, confidence) or None.
+    Thin wrapper over find_best_match_v2 for one-off calls; hot loops
+    should build the arrays once and call v2 directly.
+    """
+    result = find_best_match_v2(
+        reg_threshold,
+        build_source_arrays(candidate_thresholds),
+        use_llm=use_llm,
+        param_index=param_index,
+    )
+    if result is None:
+        return None
+    best_idx, best_score = result
+    return candidate_thresholds[best_idx], best_score
+
+
+def find_best_match_v2(
+    reg_threshold: dict,
+    source_arrays: dict,
+    use_llm: bool = USE_LLM_FOR_MATCHING,
+    param_index: Optional[dict] = None
+) -> Optional[tuple[int, float]]:
+    """
+    Find the best matching threshold in precomputed source arrays
+    (see build_source_arrays). Returns (best_index, confidence) or None,
+    where best_index points into the arrays. Candidates are never
+    mutated, so the same arrays are safe to share across comparisons.
     """
     reg_param = reg_threshold.get("parameter", "")
     reg_op = reg_threshold.get("operator", "")
-    
+
     if not reg_param:
         return None
-    
-    best_match = None
+
+    ops = source_arrays["ops"]
+
+    # Fast path: exact normalized-name hit via the inverted index
+    if param_index is not None:
+        exact = param_index.get(normalize_text(reg_param))
+        if exact:
+            best_idx = -1
+            best_score = 0.0
+            for i in exact:
+                score = 1.0 + (0.1 if operators_compatible(reg_op, ops[i]) else 0)
+                if score > best_score:
+                    best_idx = i
+                    best_score = score
+            return best_idx, best_score
+
+    thresholds = source_arrays["thresholds"]
+    params = source_arrays["params"]
+    trigram_sets = source_arrays["trigrams"]
+
+    best_idx = -1
     best_score = 0.0
-    
-    for cmp_t in candidate_thresholds:
-        cmp_param = cmp_t.get("parameter", "")
-        cmp_op = cmp_t.get("operator", "")
-        
+    # Moderate-similarity candidate indices awaiting LLM verification
+    pending: list[tuple[int, float, float]] = []
+
+    # Blocking pass setup: candidates sharing no character trigram with
+    # the regulatory name can't score well, so they're skipped before
+    # any similarity work.
+    reg_trigrams = _trigram_set(normalize_text(reg_param))
+
+    for i in range(len(thresholds)):
+        cmp_param = params[i]
         if not cmp_param:
             continue
-        
+
+        if reg_trigrams:
+            cmp_trigrams = trigram_sets[i]
+            if cmp_trigrams and not (reg_trigrams & cmp_trigrams):
+                continue
+
         # String similarity score
         str_score = string_similarity(reg_param, cmp_param)
-        
+
         # Operator compatibility bonus
-        op_bonus = 0.1 if operators_compatible(reg_op, cmp_op) else 0
-        
+        op_bonus = 0.1 if operators_compatible(reg_op, ops[i]) else 0
+
         total_score = str_score + op_bonus
-        
+
         # If high string similarity, use it directly
         if str_score >= 0.7:
             if total_score > best_score:
-                best_match = cmp_t
+                best_idx = i
                 best_score = total_score
-        
-        # If moderate similarity and LLM enabled, verify with LLM
+            # A near-perfect hit won't be improved upon - stop scanning
+            if best_score >= 0.99:
+                break
+
+        # Moderate similarity: defer to one batched LLM verification
+        # after the scan instead of a round-trip per candidate
         elif str_score >= 0.3 and use_llm:
-            is_match, llm_conf, llm_reason = llm_parameters_match(reg_param, cmp_param)
+            pending.append((i, str_score, op_bonus))
+
+    # An LLM-verified match scores at most (0.7 + 0.9) / 2 + 0.1 = 0.9,
+    # so skip the calls entirely when string matching already beat that
+    if pending and best_score < 0.9:
+        verdicts = llm_parameters_match_batch(
+            [(reg_param, params[i]) for i, _, _ in pending]
+        )
+        if verdicts is None:
+            # Batched response didn't parse - verify pair by pair
+            verdicts = [
+                llm_parameters_match(reg_param, params[i])
+                for i, _, _ in pending
+            ]
+
+        for (i, str_score, op_bonus), (is_match, llm_conf, _llm_reason) in zip(
+            pending, verdicts
+        ):
             if is_match:
                 adjusted_score = (str_score + llm_conf) / 2 + op_bonus
                 if adjusted_score > best_score:
-                    best_match = cmp_t
-                    best_match["_llm_reason"] = llm_reason
+                    best_idx = i
                     best_score = adjusted_score
-    
-    if best_match and best_score >= 0.4:
-        return best_match, best_score
-    
+
+    if best_idx >= 0 and best_score >= 0.4:
+        return best_idx, best_score
+
     return None
 
 
 # =====================================================
 # RULE COMPARISON
 # =====================================================
+def collect_thresholds(source_rules: list[dict]) -> tuple[list[dict], list[str]]:
+    """
+    Flatten all thresholds from a rule set, returning a parallel list of
+    source rule ids instead of copying every dict to tag it. Called once
+    per rule set so compare_rule doesn't rebuild the same lists for every
+    regulatory rule, and the original rule dicts stay untouched.
+    """
+    all_thresholds = []
+    source_ids = []
+    for rule in source_rules:
+        rule_id = rule.get("rule_id", rule.get("clause_id", ""))
+        for t in rule.get("thresholds", []):
+            all_thresholds.append(t)
+            source_ids.append(rule_id)
+    return all_thresholds, source_ids
+
+
 def compare_rule(
     reg_rule: dict,
-    source_rules: list[dict],
-    source_type: str
-) -> tuple[str, str]:
-    """Compare a regulatory rule against source rules."""
+    source_arrays: dict,
+    source_type: str,
+    param_index: Optional[dict] = None
+) -> tuple[int, str]:
+    """
+    Compare a regulatory rule against a precomputed source-threshold
+    index (see build_source_arrays) - built once per rule set in main(),
+    not once per regulatory rule. Returns a STATUS_* code plus the
+    explanation text.
+    """
     reg_thresholds = reg_rule.get("thresholds", [])
-    
+
     if not reg_thresholds:
-        return "N/A", "No thresholds to compare"
-    
-    # Collect all thresholds from source rules
-    all_source_thresholds = []
-    for rule in source_rules:
-        for t in rule.get("thresholds", []):
-            t_copy = t.copy()
-            t_copy["_source_id"] = rule.get("rule_id", rule.get("clause_id", ""))
-            all_source_thresholds.append(t_copy)
-    
+        return STATUS_NA, "No thresholds to compare"
+
+    all_source_thresholds = source_arrays["thresholds"]
     if not all_source_thresholds:
-        return "No", f"No {source_type} rules with thresholds"
-    
+        return STATUS_NO, f"No {source_type} rules with thresholds"
+
     # Compare each regulatory threshold
     all_compliant = True
     explanations = []
-    
+
     for reg_t in reg_thresholds:
         param = reg_t.get("parameter", "unknown")
-        
+
         # Find best matching threshold
-        match_result = find_best_match(reg_t, all_source_thresholds)
+        match_result = find_best_match_v2(reg_t, source_arrays, param_index=param_index)
         
         if match_result is None:
             # STRICT: No match = Non-compliant
@@ -334,11 +673,40 @@ def compare_rule(
             explanations.append(f"{param}: ✗ NO MATCHING RULE FOUND - cannot verify compliance")
             continue
         
-        matched_t, confidence = match_result
-        source_id = matched_t.get("_source_id", "?")
-        
-        # Compare the thresholds
-        is_compliant, explanation = compare_thresholds(reg_t, matched_t)
+        matched_idx, confidence = match_result
+        matched_t = all_source_thresholds[matched_idx]
+        source_id = source_arrays["source_ids"][matched_idx] or "?"
+
+        # Fast path off the precomputed columns: for plain numeric
+        # max/min thresholds the verdict is a single comparison against
+        # the matched candidate's already-parsed value and normalized
+        # operator; the full comparator handles the edge cases
+        # (booleans, missing values, operator mismatches) and failure
+        # explanations
+        reg_val = reg_t.get("value_numeric")
+        reg_op_norm = normalize_operator(reg_t.get("operator", ""))
+        cmp_val = source_arrays["vals"][matched_idx]
+        cmp_op_norm = source_arrays["norm_ops"][matched_idx]
+        if (
+            cmp_val is not None
+            and isinstance(reg_val, (int, float))
+            and not isinstance(reg_val, bool)
+            and reg_op_norm in ("<=", "<")
+            and cmp_op_norm in ("<=", "<")
+            and cmp_val <= reg_val
+        ):
+            is_compliant, explanation = True, f"OK: {cmp_val} ≤ {reg_val}"
+        elif (
+            cmp_val is not None
+            and isinstance(reg_val, (int, float))
+            and not isinstance(reg_val, bool)
+            and reg_op_norm in (">=", ">")
+            and cmp_op_norm in (">=", ">")
+            and cmp_val >= reg_val
+        ):
+            is_compliant, explanation = True, f"OK: {cmp_val} ≥ {reg_val}"
+        else:
+            is_compliant, explanation = compare_thresholds(reg_t, matched_t)
         
         if is_compliant:
             explanations.append(f"{param} [{source_id}]: ✓ {explanation}")
@@ -346,8 +714,27 @@ def compare_rule(
             all_compliant = False
             explanations.append(f"{param} [{source_id}]: ✗ {explanation}")
     
-    status = "Yes" if all_compliant else "No"
-    return status, "; ".join(explanations)
+    return (STATUS_YES if all_compliant else STATUS_NO), "; ".join(explanations)
+
+
+def _compare_one(
+    reg: dict,
+    policy_arrays: dict,
+    system_arrays: dict,
+    policy_index: dict,
+    system_index: dict
+) -> tuple[str, str, int, str, int, str]:
+    """One regulatory rule against both rule sets (top-level so process
+    pool workers can pickle it when LLM matching is off)."""
+    reg_id = reg.get("clause_id", reg.get("rule_id", "?"))
+    reg_name = reg.get("regulation_name", reg.get("description", "")[:40])
+
+    clause_display = f"{reg_name} ({reg_id})"
+
+    policy_status, policy_exp = compare_rule(reg, policy_arrays, "policy", policy_index)
+    system_status, system_exp = compare_rule(reg, system_arrays, "system", system_index)
+
+    return reg_id, clause_display, policy_status, policy_exp, system_status, system_exp
 
 
 # =====================================================
@@ -357,8 +744,34 @@ def load_json(path: Path) -> list[dict]:
     if not path.exists():
         print(f"⚠️ Not found: {path}")
         return []
-    with open(path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+
+    # Warm-run fast path: a pickle snapshot of the parsed rules, valid
+    # while the JSON is no newer. Rule files rarely change between runs,
+    # so repeat invocations skip the JSON parse entirely.
+    snapshot = path.with_suffix(path.suffix + ".pkl")
+    if snapshot.exists() and snapshot.stat().st_mtime >= path.stat().st_mtime:
+        try:
+            with open(snapshot, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            pass  # Corrupt/partial snapshot - fall through and reparse
+
+    # Both parsers take raw bytes, so skip the TextIOWrapper decode
+    # layer entirely (stdlib json.loads accepts UTF-8 bytes too)
+    raw = path.read_bytes()
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+    # Atomic snapshot write so a crash can't leave a torn cache file
+    # (same tmp + os.replace pattern as the s1 extraction cache)
+    tmp = snapshot.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        with open(tmp, 'wb') as f:
+            pickle.dump(data, f, protocol=5)
+        os.replace(tmp, snapshot)
+    except OSError:
+        pass  # Snapshot is an optimization only - never fail the load
+
+    return data
 
 
 def main():
@@ -370,54 +783,116 @@ def main():
     print("COMPLIANCE COMPARISON ENGINE (GENERALIZED)")
     print("=" * 60)
     
-    # Load rules
+    # Load rules - the three files are independent, so overlap the disk
+    # reads (and orjson parses) instead of blocking on each in turn
     print("\n📂 Loading rules...")
-    reg_rules = load_json(input_dir / "regulatory_rules.json")
-    policy_rules = load_json(input_dir / "bank_policy_rules.json")
-    system_rules = load_json(input_dir / "system_rules.json")
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        reg_rules, policy_rules, system_rules = executor.map(load_json, [
+            input_dir / "regulatory_rules.json",
+            input_dir / "bank_policy_rules.json",
+            input_dir / "system_rules.json",
+        ])
     
     print(f"   Regulatory: {len(reg_rules)}")
     print(f"   Policy: {len(policy_rules)}")
     print(f"   System: {len(system_rules)}")
     
-    # Compare
-    csv_rows = []
+    # Flatten source thresholds and index them by parameter name once,
+    # not once per regulatory rule
+    policy_thresholds, policy_source_ids = collect_thresholds(policy_rules)
+    system_thresholds, system_source_ids = collect_thresholds(system_rules)
+    policy_index = build_param_index(policy_thresholds)
+    system_index = build_param_index(system_thresholds)
+    # SoA arrays built once per rule set and shared by every comparison
+    policy_arrays = build_source_arrays(policy_thresholds, policy_source_ids)
+    system_arrays = build_source_arrays(system_thresholds, system_source_ids)
+
+    # Compare - SoA result columns instead of a 4-key dict per row:
+    # fewer allocations, and the summary counts become C-level list ops.
+    # Row count is known up front, so the columns are preallocated and
+    # filled by index (no incremental list resizing).
+    total = len(reg_rules)
+    clauses: list[str] = [""] * total
+    policy_statuses = array('b', bytes(total))  # STATUS_* codes, one byte per rule
+    system_statuses = array('b', bytes(total))
+    policy_exps: list[str] = [""] * total
+    system_exps: list[str] = [""] * total
+    # Progress lines buffered and flushed once after the loop - one
+    # write syscall instead of one per rule on a line-buffered terminal
+    log_buf: list[str] = []
     print("\n🔍 Comparing...")
-    
-    for reg in reg_rules:
-        reg_id = reg.get("clause_id", reg.get("rule_id", "?"))
-        reg_name = reg.get("regulation_name", reg.get("description", "")[:40])
-        
-        clause_display = f"{reg_name} ({reg_id})"
-        
-        policy_status, policy_exp = compare_rule(reg, policy_rules, "policy")
-        system_status, system_exp = compare_rule(reg, system_rules, "system")
-        
-        combined_exp = f"Policy: {policy_exp} | System: {system_exp}"
-        
-        csv_rows.append({
-            "Regulatory Clause": clause_display,
-            "Compliant with Bank Policy": policy_status,
-            "Compliant with System Rules": system_status,
-            "Explanation": combined_exp
-        })
-        
-        p_icon = "✓" if policy_status == "Yes" else ("⚠" if policy_status == "N/A" else "✗")
-        s_icon = "✓" if system_status == "Yes" else ("⚠" if system_status == "N/A" else "✗")
-        print(f"   [{reg_id}] Policy: {p_icon} | System: {s_icon}")
+
+    compare_one = partial(
+        _compare_one,
+        policy_arrays=policy_arrays,
+        system_arrays=system_arrays,
+        policy_index=policy_index,
+        system_index=system_index,
+    )
+
+    # Each rule is independent; map() keeps results in input order for
+    # the report. With LLM matching the work is HTTP-bound, so threads
+    # suffice and share the in-process verdict memo; pure string
+    # matching is CPU-bound, so processes sidestep the GIL instead.
+    if USE_LLM_FOR_MATCHING:
+        executor = ThreadPoolExecutor(max_workers=COMPARE_MAX_WORKERS)
+        map_kwargs = {}
+    else:
+        executor = ProcessPoolExecutor()
+        map_kwargs = {"chunksize": max(1, len(reg_rules) // ((os.cpu_count() or 1) * 4))}
+
+    with executor:
+        for i, (reg_id, clause_display, policy_status, policy_exp, system_status, system_exp) in enumerate(
+            executor.map(compare_one, reg_rules, **map_kwargs)
+        ):
+            clauses[i] = clause_display
+            policy_statuses[i] = policy_status
+            system_statuses[i] = system_status
+            policy_exps[i] = policy_exp
+            system_exps[i] = system_exp
+
+            p_icon = "✓" if policy_status == STATUS_YES else ("⚠" if policy_status == STATUS_NA else "✗")
+            s_icon = "✓" if system_status == STATUS_YES else ("⚠" if system_status == STATUS_NA else "✗")
+            log_buf.append(f"   [{reg_id}] Policy: {p_icon} | System: {s_icon}\n")
+
+    sys.stdout.write("".join(log_buf))
     
     # Save CSV
     output_csv = output_dir / "compliance_report.csv"
-    with open(output_csv, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=[
-            "Regulatory Clause",
-            "Compliant with Bank Policy", 
-            "Compliant with System Rules",
-            "Explanation"
-        ])
-        writer.writeheader()
-        writer.writerows(csv_rows)
-    
+    headers = [
+        "Regulatory Clause",
+        "Compliant with Bank Policy",
+        "Compliant with System Rules",
+        "Explanation"
+    ]
+    if pd is not None and total >= CSV_PANDAS_THRESHOLD:
+        # Large report: pandas' C engine formats and writes rows in
+        # batches, well ahead of per-row Python dispatch
+        pd.DataFrame({
+            headers[0]: clauses,
+            headers[1]: [_STATUS_LABELS[s] for s in policy_statuses],
+            headers[2]: [_STATUS_LABELS[s] for s in system_statuses],
+            headers[3]: [f"Policy: {p} | System: {s}" for p, s in zip(policy_exps, system_exps)],
+        }).to_csv(output_csv, index=False)
+    else:
+        # Plain csv.writer over tuples (no per-field dict lookups) into
+        # a 1 MB buffer, so the report goes out in few write syscalls
+        with open(output_csv, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+            writer = csv.writer(f)
+            writer.writerow(headers)
+            writer.writerows(zip(
+                clauses,
+                (_STATUS_LABELS[s] for s in policy_statuses),
+                (_STATUS_LABELS[s] for s in system_statuses),
+                # Combined explanation built only here, once per row written
+                (f"Policy: {p} | System: {s}" for p, s in zip(policy_exps, system_exps)),
+            ))
+    
+    # Pre-compress so the API can serve gzip to clients that accept it
+    gzip_csv = output_csv.with_name(output_csv.name + ".gz")
+    with open(output_csv, 'rb') as src, gzip.open(gzip_csv, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+
     print(f"\n✅ Saved: {output_csv}")
     
     # Summary
@@ -425,26 +900,32 @@ def main():
     print("SUMMARY")
     print("=" * 60)
     
-    p_ok = sum(1 for r in csv_rows if r["Compliant with Bank Policy"] == "Yes")
-    s_ok = sum(1 for r in csv_rows if r["Compliant with System Rules"] == "Yes")
-    total = len(csv_rows)
-    
+    # One pass over the result columns for both counts and fail lists
+    p_ok = s_ok = 0
+    p_fail: list[str] = []
+    s_fail: list[str] = []
+    for clause, p_status, s_status in zip(clauses, policy_statuses, system_statuses):
+        if p_status == STATUS_YES:
+            p_ok += 1
+        elif p_status == STATUS_NO:
+            p_fail.append(clause)
+        if s_status == STATUS_YES:
+            s_ok += 1
+        elif s_status == STATUS_NO:
+            s_fail.append(clause)
+
     print(f"\n   Policy: {p_ok}/{total} compliant")
     print(f"   System: {s_ok}/{total} compliant")
-    
-    # Non-compliant
-    p_fail = [r for r in csv_rows if r["Compliant with Bank Policy"] == "No"]
-    s_fail = [r for r in csv_rows if r["Compliant with System Rules"] == "No"]
-    
+
     if p_fail:
         print(f"\n⚠️ Policy non-compliant:")
-        for r in p_fail:
-            print(f"   - {r['Regulatory Clause']}")
-    
+        for clause in p_fail:
+            print(f"   - {clause}")
+
     if s_fail:
         print(f"\n⚠️ System non-compliant:")
-        for r in s_fail:
-            print(f"   - {r['Regulatory Clause']}")
+        for clause in s_fail:
+            print(f"   - {clause}")
 
 
 if __name__ == "__main__":